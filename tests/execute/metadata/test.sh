@@ -12,13 +12,14 @@ rlJournalStart
         rlRun "tmt run -vi $tmp"
         metadata="$tmp/plan/execute/data/test/metadata.yaml"
         rlRun "cat $metadata" 0 "Check metadata.yaml content"
-        rlAssertGrep "name: /test" $metadata
-        rlAssertGrep "summary: Simple test" $metadata
+        rlAssertGrep '"name":"/test"' $metadata
+        rlAssertGrep '"summary":"Simple test' $metadata
         rlAssertGrep "library(epel/epel)" $metadata
-        rlAssertGrep "weather: nice" $metadata
-        rlAssertGrep "duration: 5m" $metadata
-        rlRun "grep -A1 recommend $metadata | grep forest" \
-            0 "Recommend should be converted to a list"
+        rlAssertGrep '"weather":"nice"' $metadata
+        rlAssertGrep '"duration":"5m"' $metadata
+        rlAssertGrep '"recommend":\["forest"\]' $metadata
+        rlRun "python3 -c 'import json, sys; json.load(sys.stdin)' < $metadata" \
+            0 "Metadata should be valid json"
     rlPhaseEnd
 
     rlPhaseStartCleanup
@@ -0,0 +1,65 @@
+import datetime
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+import tmt
+from tmt.steps.execute import Execute, ExecutePlugin
+
+
+@pytest.fixture
+def execute(tmpdir):
+    """ Execute step with the workdir in a temporary directory """
+    plan = MagicMock(my_run=None, workdir=str(tmpdir))
+    step = Execute(plan=plan, data={'how': 'tmt'})
+    step.opt = lambda key, default=None: (
+        0 if key in ('debug', 'verbose') else default)
+    step.info = MagicMock()
+    return step
+
+
+def _read(step, filename):
+    """ Read a file from the step workdir """
+    with open(os.path.join(step.workdir, filename)) as file:
+        return file.read()
+
+
+def test_save_without_results(execute):
+    # The results file is required even if no tests were executed
+    execute.save()
+    assert tmt.utils.yaml_to_dict(_read(execute, 'results.yaml')) == {}
+
+
+def test_save_and_load_results(execute, tmpdir):
+    # Results file is created before the execution starts
+    execute.status('todo')
+    execute.save()
+    phase = MagicMock(spec=ExecutePlugin, order=50)
+    phase.results.return_value = [
+        tmt.Result({'result': 'fail'}, '/test/one'),
+        tmt.Result({'result': 'pass'}, '/test/two')]
+    execute._phases = [phase]
+    execute.plan.provision.guests.return_value = [MagicMock()]
+    execute.go()
+    assert tmt.utils.yaml_to_dict(_read(execute, 'results.yaml')) == {
+        '/test/one': {'result': 'fail', 'log': []},
+        '/test/two': {'result': 'pass', 'log': []}}
+    # Results are loaded back by a new step
+    plan = MagicMock(my_run=None, workdir=str(tmpdir))
+    step = Execute(plan=plan, data={'how': 'tmt'})
+    step.load()
+    assert [(result.name, result.result) for result in step.results()] == [
+        ('/test/one', 'fail'), ('/test/two', 'pass')]
+
+
+@pytest.mark.parametrize(('metadata', 'expected'), [
+    ({'summary': 'Café 😀'}, '{"summary":"Café 😀"}'),
+    ({'date': datetime.date(2022, 1, 1)}, 'date: 2022-01-01\n'),
+    ])
+def test_prepare_tests_metadata(metadata, expected):
+    plugin = MagicMock()
+    plugin.discover.tests.return_value = [MagicMock(_metadata=metadata)]
+    ExecutePlugin.prepare_tests(plugin)
+    assert plugin.write.call_args[0][1] == expected
+    assert tmt.utils.yaml_to_dict(expected) == metadata
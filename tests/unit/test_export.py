@@ -0,0 +1,309 @@
+import json
+import time
+import xmlrpc.client
+from unittest.mock import MagicMock, patch
+
+import fmf
+import pytest
+
+import tmt.export
+from tmt.utils import ConvertError
+
+
+def _bugzilla(bugs):
+    """ Prepare a mocked bugzilla instance with given bugs """
+    bugzilla = MagicMock()
+    bugzilla._proxy.Bug.get.return_value = {'bugs': bugs}
+    return bugzilla
+
+
+def _bug(bug_id, flags=None, external_bugs=None):
+    """ Prepare bug data as returned by Bug.get """
+    return {
+        'id': bug_id,
+        'flags': flags or [],
+        'external_bugs': external_bugs or []}
+
+
+def test_bz_set_coverage():
+    bugzilla = _bugzilla([
+        _bug(1),
+        _bug(2,
+             flags=[{'name': 'qe_test_coverage', 'status': '+'}],
+             external_bugs=[{'ext_bz_id': 69, 'ext_bz_bug_id': 123}])])
+    with patch('tmt.export.get_bz_instance', return_value=bugzilla):
+        tmt.export.bz_set_coverage([1, 2], 123, 69)
+    proxy = bugzilla._proxy
+    # Only the bug without the flag and the link is updated
+    proxy.Flag.update.assert_called_once_with({
+        'ids': [1],
+        'nomail': 1,
+        'updates': [{'name': 'qe_test_coverage', 'status': '+'}]})
+    proxy.ExternalBugs.add_external_bug.assert_called_once_with({
+        'bug_ids': [1],
+        'nomail': 1,
+        'external_bugs': [{
+            'ext_type_id': 69,
+            'ext_bz_bug_id': 123,
+            'ext_description': ''}]})
+
+
+def test_bz_set_coverage_flag_failure():
+    bugzilla = _bugzilla([_bug(1), _bug(2)])
+    bugzilla._proxy.Flag.update.side_effect = xmlrpc.client.Fault(
+        1, 'Cannot set the flag')
+    with patch('tmt.export.get_bz_instance', return_value=bugzilla):
+        # Failed flag update is not fatal, the links are still added
+        tmt.export.bz_set_coverage([1, 2], 123, 69)
+    assert bugzilla._proxy.Flag.update.call_count == 2
+    assert bugzilla._proxy.ExternalBugs.add_external_bug.call_count == 2
+
+
+def test_bz_set_coverage_link_failure():
+    bugzilla = _bugzilla([_bug(1), _bug(2)])
+    bugzilla._proxy.ExternalBugs.add_external_bug.side_effect = [
+        xmlrpc.client.Fault(1, 'Cannot link'), None]
+    with patch('tmt.export.get_bz_instance', return_value=bugzilla):
+        with pytest.raises(ConvertError):
+            tmt.export.bz_set_coverage([1, 2], 123, 69)
+    # Remaining bugs are processed even after a failure
+    assert bugzilla._proxy.ExternalBugs.add_external_bug.call_count == 2
+
+
+class _TestPlan:
+    """ Nitrate test plan searched by the general plan lookup """
+    searches = []
+
+    def __init__(self, plan_id):
+        self.id = plan_id
+
+    @classmethod
+    def search(cls, **query):
+        cls.searches.append(query)
+        return [cls(42)]
+
+
+@pytest.fixture
+def nitrate(monkeypatch, tmp_path):
+    """ Fake nitrate with the user cache directory in a temporary path """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setattr(_TestPlan, 'searches', [])
+    config = MagicMock()
+    config.return_value.nitrate.url = 'https://nitrate/xmlrpc/'
+    monkeypatch.setattr(tmt.export, 'nitrate', MagicMock(
+        TestPlan=_TestPlan, Config=config, NitrateError=Exception),
+        raising=False)
+    tmt.export.find_general_plan.cache_clear()
+    tmt.export._general_plans_cache.cache_clear()
+    yield tmp_path / 'tmt' / 'general_plans.json'
+    tmt.export.find_general_plan.cache_clear()
+    tmt.export._general_plans_cache.cache_clear()
+
+
+def _cached(path):
+    """ Return plan ids stored in the general plans cache """
+    with open(path) as cache:
+        return dict(
+            (key, entry['id']) for key, entry in json.load(cache).items())
+
+
+def test_general_plans_cache_store_and_load(nitrate):
+    assert tmt.export.find_general_plan('tmt').id == 42
+    assert len(_TestPlan.searches) == 1
+    assert _cached(nitrate) == {'https://nitrate/xmlrpc/ tmt': 42}
+    # A new process uses the cached plan without searching
+    tmt.export.find_general_plan.cache_clear()
+    tmt.export._general_plans_cache.cache_clear()
+    assert tmt.export.find_general_plan('tmt').id == 42
+    assert len(_TestPlan.searches) == 1
+
+
+def test_general_plans_cache_expired(nitrate):
+    nitrate.parent.mkdir()
+    expired = time.time() - tmt.export.GENERAL_PLANS_CACHE_TTL - 1
+    nitrate.write_text(json.dumps({
+        'https://nitrate/xmlrpc/ tmt': {'id': 1, 'time': expired},
+        'https://nitrate/xmlrpc/ fmf': {'id': 2, 'time': expired}}))
+    assert tmt.export.find_general_plan('tmt').id == 42
+    assert len(_TestPlan.searches) == 1
+    # Expired entries are dropped when storing
+    assert _cached(nitrate) == {'https://nitrate/xmlrpc/ tmt': 42}
+
+
+@pytest.mark.parametrize('content', [
+    'not a json',
+    '[1, 2]',
+    '{"https://nitrate/xmlrpc/ tmt": 1}',
+    '{"https://nitrate/xmlrpc/ tmt": {"time": 1e11}}',
+    '{"https://nitrate/xmlrpc/ tmt": {"id": 1, "time": "x"}}',
+    '{"https://nitrate/xmlrpc/ tmt": {"id": "1", "time": 1}}',
+    '{"https://nitrate/xmlrpc/ tmt": {"id": 1, "time": 1e11}}',
+    ])
+def test_general_plans_cache_corrupted(nitrate, content):
+    nitrate.parent.mkdir()
+    nitrate.write_text(content)
+    assert tmt.export.find_general_plan('tmt').id == 42
+    assert len(_TestPlan.searches) == 1
+    assert _cached(nitrate) == {'https://nitrate/xmlrpc/ tmt': 42}
+
+
+def test_general_plans_cache_dry(nitrate):
+    assert tmt.export.find_general_plan('tmt', dry=True).id == 42
+    assert not nitrate.exists()
+
+
+def test_general_plans_cache_path(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert tmt.export._general_plans_cache_path() == str(
+        tmp_path / 'tmt' / 'general_plans.json')
+    # Relative paths are ignored
+    monkeypatch.setenv('XDG_CACHE_HOME', 'relative')
+    monkeypatch.setenv('HOME', str(tmp_path))
+    assert tmt.export._general_plans_cache_path() == str(
+        tmp_path / '.cache' / 'tmt' / 'general_plans.json')
+
+
+MANUAL_TEST = """
+# Setup
+Install the package
+
+# Test
+## Step
+First step
+## Expect
+First result
+
+# Test one
+## Test Step
+Second step
+## Result
+Second result
+
+# Test two
+## Step
+Third step
+## Expected Result
+Third result
+
+# Cleanup
+Remove the package
+"""
+
+
+def _manual_test(tmp_path, content):
+    """ Store a manual test document, return its path """
+    path = tmp_path / 'test.md'
+    path.write_text(content)
+    return str(path)
+
+
+def test_convert_manual_test(tmp_path):
+    path = _manual_test(tmp_path, MANUAL_TEST)
+    assert tmt.export.convert_manual_to_nitrate(path) == (
+        '<b>Test</b><p>Step 1.</p><p>First step</p>\n'
+        '<b>Test one</b><p>Step 2.</p><p>Second step</p>\n'
+        '<b>Test two</b><p>Step 3.</p><p>Third step</p>\n',
+        '<b>Test</b><p>Step 1.</p><p>First result</p>\n'
+        '<b>Test one</b><p>Step 2.</p><p>Second result</p>\n'
+        '<b>Test two</b><p>Step 3.</p><p>Third result</p>\n',
+        '<p>Install the package</p>\n',
+        '<p>Remove the package</p>\n')
+    assert tmt.export.check_md_file_respects_spec(path) == []
+
+
+def test_convert_manual_test_invalid(tmp_path):
+    path = _manual_test(tmp_path, (
+        'Text before\n# Setup\nOne\n# Setup\nTwo\n'
+        '# Testing\n## Step\nStep\n### Weird\n##### Too deep\n'))
+    # Text before the first heading and the repeated setup are ignored
+    assert tmt.export.convert_manual_to_nitrate(path) == (
+        '<p>Step 1.</p><p>Step</p>\n', '', '<p>One</p>\n', '')
+    # Unknown headings are reported in a random order
+    assert sorted(tmt.export.check_md_file_respects_spec(path)) == [
+        '"Test" section doesn\'t exist in the Markdown file',
+        '2 headings "<h1>Setup</h1>" are used',
+        'unknown html heading "<h1>Testing</h1>" is used',
+        'unknown html heading "<h3>Weird</h3>" is used']
+
+
+def test_convert_manual_test_unpaired(tmp_path):
+    path = _manual_test(
+        tmp_path, '# Test\n## Step\nOne\n## Step\nTwo\n## Expect\nResult\n')
+    assert tmt.export.convert_manual_to_nitrate(path) == (
+        '<b>Test</b><p>Step 1.</p><p>One</p>\n<p>Step 2.</p><p>Two</p>\n',
+        '<b>Test</b><p>Step 1.</p><p>Result</p>\n', '', '')
+    assert tmt.export.check_md_file_respects_spec(path) == [
+        'Heading "<h2>Step</h2>" from the section "Step" is used \n'
+        'outside of Test sections.'] * 2
+
+
+def test_convert_manual_test_empty(tmp_path):
+    path = _manual_test(tmp_path, '')
+    assert tmt.export.convert_manual_to_nitrate(path) == ('', '', '', '')
+    assert tmt.export.check_md_file_respects_spec(path) == [
+        '"Test" section doesn\'t exist in the Markdown file']
+
+
+def test_html_sections():
+    lines = [
+        '<p>ignored</p>', '<h1>Setup</h1>', '<p>one</p>', '<p>two</p>',
+        '<h1>Test</h1>', '<h2>Step</h2>', '<p>three</p>']
+    assert list(tmt.export._html_sections(lines)) == [
+        (1, '<h1>Setup</h1>', ['<p>one</p>', '<p>two</p>']),
+        (4, '<h1>Test</h1>', []),
+        (5, '<h2>Step</h2>', ['<p>three</p>'])]
+    assert list(tmt.export._html_sections(['<p>text</p>'])) == []
+
+
+@pytest.mark.parametrize(('line', 'expected'), [
+    ('<h1>Test</h1>', (1, 'Test')),
+    ('<h2>Test Step</h2>', (2, 'Test Step')),
+    ('<h4>Deep</h4>', (4, 'Deep')),
+    ('<h5>Too deep</h5>', None),
+    ('<h1></h1>', None),
+    ('<h1>Test</h1> ', None),
+    ('<p>Test</p>', None),
+    ('text', None),
+    ])
+def test_classify_heading(line, expected):
+    assert tmt.export._classify_heading(line) == expected
+
+
+def test_dry_case():
+    case = tmt.export._DryCase()
+    # Attribute changes are ignored
+    case.summary = 'changed'
+    assert isinstance(case.summary, tmt.export._DryCollection)
+    # Container and case updates do nothing
+    case.components.add(['first', 'second'])
+    case.testplans.remove('plan')
+    case.bugs.clear()
+    case.update()
+
+
+def _notes(environment):
+    """ Prepare test case notes with given environment """
+    return (
+        "[structured-field-start]\n"
+        "This is StructuredField version 1. Please, edit with care.\n\n"
+        f"[environment]\n{environment}\n\n"
+        "[structured-field-end]\n")
+
+
+def test_enabled_for_environment():
+    test = MagicMock(node=fmf.Tree({
+        'test': './test.sh',
+        'adjust': {'enabled': False, 'when': 'distro == fedora'}}))
+    fedora = _notes('arch = x86_64, aarch64\ndistro = fedora')
+    tmt.export._environment_context.cache_clear()
+    assert tmt.export.enabled_for_environment(test, fedora) is False
+    assert tmt.export.enabled_for_environment(
+        test, _notes('distro = rhel and centos')) is True
+    # No environment defined, test is enabled
+    assert tmt.export.enabled_for_environment(test, '') is True
+    assert tmt.export.enabled_for_environment(test, _notes('junk')) is True
+    # The context is prepared only once for the same notes
+    assert tmt.export.enabled_for_environment(test, fedora) is False
+    assert tmt.export._environment_context.cache_info().hits == 1
+    # The original test node is not adjusted
+    assert test.node.get('enabled') is None
@@ -0,0 +1,65 @@
+import os
+from unittest.mock import MagicMock, patch
+
+from tmt.steps.provision import Guest, GuestSsh
+
+
+def test_push_many_ssh(tmp_path):
+    source = tmp_path / 'script'
+    source.write_text('#!/bin/sh\n')
+    guest = GuestSsh({'guest': 'host', 'user': 'root'})
+    staged = dict()
+
+    def run(command, **kwargs):
+        """ Inspect the staging directory while it exists """
+        for path in command:
+            if '/./' in path:
+                staging, relative = path.split('/./')
+                staged[relative] = open(path).read()
+                # Nothing else should be staged
+                assert sorted(
+                    os.path.relpath(os.path.join(root, name), staging)
+                    for root, dirs, files in os.walk(staging)
+                    for name in files) == ['bin/a', 'usr/local/bin/b']
+
+    with patch.object(GuestSsh, '_ssh_command', return_value='ssh'), \
+            patch.object(GuestSsh, 'run', side_effect=run) as mocked, \
+            patch.object(GuestSsh, 'debug') as debug:
+        guest.push_many(
+            [(str(source), '/bin/a'), (str(source), '/usr/local/bin/b')],
+            options=['-p', '--chmod=755'])
+
+    # All files are transferred by a single rsync command
+    mocked.assert_called_once()
+    command = mocked.call_args[0][0]
+    assert command[:6] == [
+        'rsync', '-p', '--chmod=755', '--relative', '--no-implied-dirs',
+        '-e']
+    assert command[6] == 'ssh'
+    assert [path.split('/./')[1] for path in command[7:-1]] == [
+        'bin/a', 'usr/local/bin/b']
+    assert command[-1] == 'root@host:/'
+    assert staged == {'bin/a': '#!/bin/sh\n', 'usr/local/bin/b': '#!/bin/sh\n'}
+    # Destinations are logged instead of the staged files
+    assert [call[0][0] for call in debug.call_args_list] == [
+        f"Copy '{source}' to '/bin/a' on the guest.",
+        f"Copy '{source}' to '/usr/local/bin/b' on the guest.",
+        "Copy 2 files to '/' on the guest."]
+
+
+def test_push_many_ssh_empty():
+    guest = GuestSsh({'guest': 'host', 'user': 'root'})
+    with patch.object(GuestSsh, 'run') as mocked:
+        guest.push_many([])
+    # Nothing to transfer, rsync is not run at all
+    mocked.assert_not_called()
+
+
+def test_push_many_default():
+    guest = Guest({'guest': 'host'})
+    guest.push = MagicMock()
+    guest.push_many([('a', '/bin/a'), ('b', '/bin/b')], options=['-p'])
+    # Files are pushed one by one by default
+    assert [call[1] for call in guest.push.call_args_list] == [
+        {'source': 'a', 'destination': '/bin/a', 'options': ['-p']},
+        {'source': 'b', 'destination': '/bin/b', 'options': ['-p']}]
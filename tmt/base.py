@@ -1,6 +1,7 @@
 
 """ Base Metadata Classes """
 
+import collections
 import copy
 import dataclasses
 import functools
@@ -2139,9 +2140,8 @@ class Result(object):
     @staticmethod
     def total(results):
         """ Return dictionary with total stats for given results """
-        stats = dict([(result, 0) for result in Result._results])
-        for result in results:
-            stats[result.result] += 1
+        stats = dict.fromkeys(Result._results, 0)
+        stats.update(collections.Counter(result.result for result in results))
         return stats
 
     @staticmethod
@@ -3,9 +3,16 @@
 """ Export metadata into nitrate """
 
 
+import bisect
+import collections
 import email
+import fcntl
+import heapq
+import json
+import operator
 import os
 import re
+import time
 import traceback
 import xmlrpc.client
 from functools import lru_cache
@@ -34,6 +41,44 @@ RE_BUGZILLA_URL = r'bugzilla.redhat.com/show_bug.cgi\?id=(\d+)'
 RE_POLARION_URL = r'.*/polarion/#/project/.*/workitem\?id=(.*)'
 LEGACY_POLARION_PROJECTS = set(['RedHatEnterpriseLinux7'])
 
+# Persistent cache of general plans found for components (relative to
+# the user cache directory)
+GENERAL_PLANS_CACHE = 'tmt/general_plans.json'
+# Number of seconds for which cached general plans are valid
+GENERAL_PLANS_CACHE_TTL = 24 * 60 * 60
+
+# Precompiled regular expressions
+_RE_TEST_H1 = re.compile(r'^<h1>(Test .*|Test)</h1>$')
+_RE_BUGZILLA = re.compile(RE_BUGZILLA_URL)
+_RE_POLARION = re.compile(RE_POLARION_URL)
+_RE_ENV_SPLIT = re.compile(r',|and')
+
+
+class _DryCollection:
+    """ Test case container which ignores all changes (dry mode) """
+
+    def add(self, *args, **kwargs):
+        pass
+
+    def remove(self, *args, **kwargs):
+        pass
+
+    def clear(self):
+        pass
+
+
+class _DryCase:
+    """ Nitrate test case which ignores all changes (dry mode) """
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __getattr__(self, name):
+        return _DryCollection()
+
+    def update(self):
+        pass
+
 
 def import_nitrate():
     """ Conditionally import the nitrate module """
@@ -87,29 +132,104 @@ def get_bz_instance():
     return bz_instance
 
 
+@lru_cache(maxsize=None)
+def _nitrate_component(name, product_id):
+    """ Return nitrate component, avoid repeated server lookups """
+    return nitrate.Component(name=name, product=product_id)
+
+
+@lru_cache(maxsize=None)
+def _nitrate_case_status(name):
+    """ Return nitrate case status, avoid repeated server lookups """
+    return nitrate.CaseStatus(name)
+
+
+@lru_cache(maxsize=None)
+def _nitrate_notes_fmf_id(notes):
+    """ Parse fmf identifier from test case notes, None if not found """
+    struct_field = tmt.utils.StructuredField(notes)
+    try:
+        return tmt.utils.yaml_to_dict(struct_field.get('fmf'))
+    except tmt.utils.StructuredFieldError:
+        return None
+
+
 def _nitrate_find_fmf_testcases(test):
     """
     Find all Nitrate test cases with the same fmf identifier
 
     All component general plans are explored for possible duplicates.
     """
+    # Matching notes have to contain the url, no need to parse others
+    url = test.fmf_id.get('url')
     for component in test.component:
         try:
-            for testcase in find_general_plan(component).testcases:
-                struct_field = tmt.utils.StructuredField(testcase.notes)
-                try:
-                    fmf_id = tmt.utils.yaml_to_dict(struct_field.get('fmf'))
-                    if fmf_id == test.fmf_id:
-                        echo(style(
-                            f"Existing test case '{testcase.identifier}' "
-                            f"found for given fmf id.", fg='magenta'))
-                        yield testcase
-                except tmt.utils.StructuredFieldError:
-                    pass
+            general_plan = find_general_plan(component, test.opt('dry'))
+            for testcase in general_plan.testcases:
+                if url and url not in testcase.notes:
+                    continue
+                if _nitrate_notes_fmf_id(testcase.notes) == test.fmf_id:
+                    echo(style(
+                        f"Existing test case '{testcase.identifier}' "
+                        f"found for given fmf id.", fg='magenta'))
+                    yield testcase
         except nitrate.NitrateError:
             pass
 
 
+@lru_cache(maxsize=None)
+def _section_headings(*sections):
+    """ Frozen set of html headings belonging to given sections """
+    return frozenset(
+        heading
+        for section in sections
+        for heading in tmt.base.SECTIONS_HEADINGS[section])
+
+
+@lru_cache(maxsize=None)
+def _heading_patterns():
+    """ Known html headings with their compiled patterns, in spec order """
+    return tuple(
+        (heading, re.compile("^" + heading + "$"))
+        for headings in tmt.base.SECTIONS_HEADINGS.values()
+        for heading in headings)
+
+
+def _classify_heading(line):
+    """
+    Check whether the line is a html heading (level 1 to 4)
+
+    Return (level, text) tuple for heading lines, None otherwise.
+    Plain string operations are much faster than a regular expression.
+    """
+    if (len(line) > 9
+            and line.startswith('<h') and line[2] in '1234' and line[3] == '>'
+            and line[-5:-2] == '</h' and line[-2] in '1234'
+            and line[-1] == '>'):
+        return int(line[2]), line[4:-5]
+    return None
+
+
+def _html_sections(html_lines):
+    """
+    Walk html document lines and yield its sections
+
+    For each heading yield (index, heading, lines) tuple with the index
+    of the heading line and a list of lines until the next heading.
+    Lines before the first heading are skipped.
+    """
+    section = None
+    for index, line in enumerate(html_lines):
+        if _classify_heading(line):
+            if section:
+                yield section
+            section = (index, line, [])
+        elif section:
+            section[2].append(line)
+    if section:
+        yield section
+
+
 def convert_manual_to_nitrate(test_md):
     """
     Convert Markdown document to html sections.
@@ -120,44 +240,22 @@ def convert_manual_to_nitrate(test_md):
     as html strings.
     """
 
-    values = []
-    sections_headings = {}
-    for _ in list(tmt.base.SECTIONS_HEADINGS.values()):
-        values += _
-    for _ in values:
-        sections_headings[_] = []
-
-    html = markdown_to_html(test_md)
-    html_splitlines = html.splitlines()
-
-    for key in sections_headings.keys():
-        result = []
-        i = 0
-        while html_splitlines:
-            try:
-                if re.search("^" + key + "$", html_splitlines[i]):
-                    html_content = str()
-                    if key.startswith('<h1>Test'):
-                        html_content = html_splitlines[i].\
-                            replace('<h1>', '<b>').\
-                            replace('</h1>', '</b>')
-                    for j in range(i + 1, len(html_splitlines)):
-                        if re.search("^<h[1-4]>(.+?)</h[1-4]>$",
-                                     html_splitlines[j]):
-                            result.append([i, html_content])
-                            i = j - 1
-                            break
-                        html_content += html_splitlines[j] + "\n"
-                        # Check end of the file
-                        if j + 1 == len(html_splitlines):
-                            result.append([i, html_content])
-            except IndexError:
-                sections_headings[key] = result
-                break
-            i += 1
-            if i >= len(html_splitlines):
-                sections_headings[key] = result
-                break
+    key_patterns = _heading_patterns()
+    sections_headings = {key: [] for key, _ in key_patterns}
+
+    html_splitlines = markdown_to_html(test_md).splitlines()
+    for index, heading, lines in _html_sections(html_splitlines):
+        key = next(
+            (key for key, pattern in key_patterns if pattern.search(heading)),
+            None)
+        # Skip unknown headings and the heading on the very last line
+        if key is None or index + 1 == len(html_splitlines):
+            continue
+        content = ''.join(line + "\n" for line in lines)
+        if key.startswith('<h1>Test'):
+            content = heading.replace('<h1>', '<b>').replace(
+                '</h1>', '</b>') + content
+        sections_headings[key].append([index, content])
 
     def concatenate_headings_content(headings):
         content = list()
@@ -166,25 +264,29 @@ def convert_manual_to_nitrate(test_md):
         return content
 
     def enumerate_content(content):
-        content.sort()
+        content.sort(key=operator.itemgetter(0))
         for c in range(len(content)):
             content[c][1] = f"<p>Step {c + 1}.</p>" + content[c][1]
         return content
 
+    def merge_content(content, test):
+        """ Merge sorted section content with test headings """
+        return ''.join(
+            v[1] for v in heapq.merge(
+                content, test, key=operator.itemgetter(0)))
+
     sorted_test = sorted(concatenate_headings_content((
         '<h1>Test</h1>',
-        '<h1>Test .*</h1>')))
+        '<h1>Test .*</h1>')), key=operator.itemgetter(0))
 
-    sorted_step = sorted(enumerate_content(concatenate_headings_content((
+    step = merge_content(enumerate_content(concatenate_headings_content((
         '<h2>Step</h2>',
-        '<h2>Test Step</h2>'))) + sorted_test)
-    step = ''.join([f"{v[1]}" for v in sorted_step])
+        '<h2>Test Step</h2>'))), sorted_test)
 
-    sorted_expect = sorted(enumerate_content(concatenate_headings_content((
+    expect = merge_content(enumerate_content(concatenate_headings_content((
         '<h2>Expect</h2>',
         '<h2>Result</h2>',
-        '<h2>Expected Result</h2>'))) + sorted_test)
-    expect = ''.join([f"{v[1]}" for v in sorted_expect])
+        '<h2>Expected Result</h2>'))), sorted_test)
 
     def check_section_exists(text):
         try:
@@ -211,8 +313,9 @@ def bz_set_coverage(bug_ids, case_id, tracker_id):
     for bug in bugs_data['bugs']:
         # Process flag (might fail for some types)
         bug_id = bug['id']
-        if 'qe_test_coverage+' not in set(
-                [x['name'] + x['status'] for x in bug['flags']]):
+        if not any(
+                flag['name'] == 'qe_test_coverage' and flag['status'] == '+'
+                for flag in bug['flags']):
             try:
                 bz_instance._proxy.Flag.update({
                     'ids': [bug_id],
@@ -231,10 +334,9 @@ def bz_set_coverage(bug_ids, case_id, tracker_id):
                     f"Failed to set qe_test_coverage+ flag for BZ#{bug_id}",
                     fg='red'))
         # Process external tracker - should succeed
-        current = set(
-            [b['ext_bz_bug_id'] for b in bug['external_bugs']
-             if b['ext_bz_id'] == tracker_id])
-        if case_id not in current:
+        if not any(
+                b['ext_bz_id'] == tracker_id and b['ext_bz_bug_id'] == case_id
+                for b in bug['external_bugs']):
             query = {
                 'bug_ids': [bug_id],
                 'nomail': no_email,
@@ -376,6 +478,9 @@ def export_to_nitrate(test):
     except (nitrate.NitrateError, gssapi.raw.misc.GSSError) as error:
         raise ConvertError(error)
 
+    # Changes of the test case are not stored in the dry mode
+    case_proxy = _DryCase() if dry_mode else nitrate_case
+
     # Check if URL is accessible, to be able to reach from nitrate
     check_git_url(test.fmf_id['url'])
 
@@ -386,44 +491,40 @@ def export_to_nitrate(test):
                    or prepare_extra_summary(test))
     except ConvertError:
         summary = test.name
-    if not dry_mode:
-        nitrate_case.summary = summary
+    case_proxy.summary = summary
     echo(style('summary: ', fg='green') + summary)
 
     # Script
     if test.node.get('extra-task'):
-        if not dry_mode:
-            nitrate_case.script = test.node.get('extra-task')
+        case_proxy.script = test.node.get('extra-task')
         echo(style('script: ', fg='green') + test.node.get('extra-task'))
 
     # Components and General plan
     # First remove any components that are already there
-    if not dry_mode:
-        nitrate_case.components.clear()
+    case_proxy.components.clear()
     # Only these general plans should stay
     expected_general_plans = set()
-    # Then add fmf ones
+    # Then add fmf ones (collect them and add all at once)
+    nitrate_components = []
+    component_names = []
     if test.component:
         echo(style('components: ', fg='green') + ' '.join(test.component))
         for component in test.component:
             try:
-                nitrate_component = nitrate.Component(
-                    name=component, product=DEFAULT_PRODUCT.id)
-                if not dry_mode:
-                    nitrate_case.components.add(nitrate_component)
+                nitrate_components.append(
+                    _nitrate_component(component, DEFAULT_PRODUCT.id))
+                component_names.append(component)
             except nitrate.xmlrpc_driver.NitrateError as error:
                 log.debug(error)
                 echo(style(
                     f"Failed to add component '{component}'.", fg='red'))
             if general:
                 try:
-                    general_plan = find_general_plan(component)
+                    general_plan = find_general_plan(component, dry_mode)
                     expected_general_plans.add(general_plan)
                     echo(style(
                         f"Linked to general plan '{general_plan}'.",
                         fg='magenta'))
-                    if not dry_mode:
-                        nitrate_case.testplans.add(general_plan)
                     if link_runs:
                         add_to_nitrate_runs(
                             nitrate_case, general_plan, test, dry_mode)
@@ -432,16 +533,33 @@ def export_to_nitrate(test):
                     echo(style(
                         f"Failed to find general test plan for '{component}'.",
                         fg='red'))
+    if nitrate_components:
+        try:
+            case_proxy.components.add(nitrate_components)
+        except nitrate.xmlrpc_driver.NitrateError as error:
+            log.debug(error)
+            echo(style(
+                f"Failed to add components "
+                f"'{' '.join(component_names)}'.", fg='red'))
+    if expected_general_plans:
+        try:
+            case_proxy.testplans.add(list(expected_general_plans))
+        except nitrate.NitrateError as error:
+            log.debug(error)
+            plans = fmf.utils.listed(expected_general_plans, quote="'")
+            echo(style(f"Failed to link general plans {plans}.", fg='red'))
     # Remove unexpected general plans
     if general and nitrate_case:
         # Remove also all general plans linked to testcase
-        for nitrate_plan in [plan for plan in nitrate_case.testplans]:
-            if (nitrate_plan.type.name == "General"
-                    and nitrate_plan not in expected_general_plans):
+        # (take a snapshot, the container is modified in the loop)
+        general_plans = [
+            plan for plan in nitrate_case.testplans
+            if plan.type.name == "General"]
+        for nitrate_plan in general_plans:
+            if nitrate_plan not in expected_general_plans:
                 echo(style(
                     f"Removed general plan '{nitrate_plan}'.", fg='red'))
-                if not dry_mode:
-                    nitrate_case.testplans.remove(nitrate_plan)
+                case_proxy.testplans.remove(nitrate_plan)
 
     # Tags
     # Convert 'tier' attribute into a Tier tag
@@ -449,9 +567,8 @@ def export_to_nitrate(test):
         test.tag.append(f"Tier{test.tier}")
     # Add special fmf-export tag
     test.tag.append('fmf-export')
-    if not dry_mode:
-        nitrate_case.tags.clear()
-        nitrate_case.tags.add([nitrate.Tag(tag) for tag in test.tag])
+    case_proxy.tags.clear()
+    case_proxy.tags.add([nitrate.Tag(tag) for tag in test.tag])
     echo(style('tags: ', fg='green') + ' '.join(set(test.tag)))
 
     # Default tester
@@ -461,34 +578,30 @@ def export_to_nitrate(test):
             email_address = email.utils.parseaddr(test.contact[0])[1]
             nitrate_user = nitrate.User(email_address)
             nitrate_user._fetch()  # To check that user exists
-            if not dry_mode:
-                nitrate_case.tester = nitrate_user
+            case_proxy.tester = nitrate_user
             echo(style('default tester: ', fg='green') + email_address)
         except nitrate.NitrateError as error:
             log.debug(error)
             raise ConvertError(f"Nitrate issue: {error}")
 
     # Duration
-    if not dry_mode:
-        nitrate_case.time = test.duration
+    case_proxy.time = test.duration
     echo(style('estimated time: ', fg='green') + test.duration)
 
     # Manual
-    if not dry_mode:
-        nitrate_case.automated = not test.manual
+    case_proxy.automated = not test.manual
     echo(style('automated: ', fg='green') + ['auto', 'manual'][test.manual])
 
     # Status
-    current_status = nitrate_case.status if nitrate_case else nitrate.CaseStatus('CONFIRMED')
+    confirmed = _nitrate_case_status('CONFIRMED')
+    current_status = nitrate_case.status if nitrate_case else confirmed
     # Enable enabled tests
     if test.enabled:
-        if not dry_mode:
-            nitrate_case.status = nitrate.CaseStatus('CONFIRMED')
+        case_proxy.status = confirmed
         echo(style('status: ', fg='green') + 'CONFIRMED')
     # Disable disabled tests which are CONFIRMED
-    elif current_status == nitrate.CaseStatus('CONFIRMED'):
-        if not dry_mode:
-            nitrate_case.status = nitrate.CaseStatus('DISABLED')
+    elif current_status == confirmed:
+        case_proxy.status = _nitrate_case_status('DISABLED')
         echo(style('status: ', fg='green') + 'DISABLED')
     # Keep disabled tests in their states
     else:
@@ -497,14 +610,12 @@ def export_to_nitrate(test):
     # Environment
     if test.environment:
         environment = ' '.join(tmt.utils.shell_variables(test.environment))
-        if not dry_mode:
-            nitrate_case.arguments = environment
+        case_proxy.arguments = environment
         echo(style('arguments: ', fg='green') + environment)
     else:
         # FIXME unable clear to set empty arguments
         # (possibly error in xmlrpc, BZ#1805687)
-        if not dry_mode:
-            nitrate_case.arguments = ' '
+        case_proxy.arguments = ' '
         echo(style('arguments: ', fg='green') + "' '")
 
     # Structured Field
@@ -535,8 +646,10 @@ def export_to_nitrate(test):
     echo(style('fmf id:\n', fg='green') + fmf_id.strip())
 
     # Warning
-    if WARNING not in struct_field.header():
-        struct_field.header(WARNING + struct_field.header())
+    # Added by tmt at the very beginning of the header
+    header = struct_field.header()
+    if not header.startswith(WARNING):
+        struct_field.header(WARNING + header)
         echo(style(
             'Add migration warning to the test case notes.', fg='green'))
 
@@ -548,8 +661,7 @@ def export_to_nitrate(test):
     echo(style(f"Append the ID {uuid}.", fg='green'))
 
     # Saving case.notes with edited StructField
-    if not dry_mode:
-        nitrate_case.notes = struct_field.save()
+    case_proxy.notes = struct_field.save()
 
     # Export manual test instructions from *.md file to nitrate as html
     md_path = return_markdown_file()
@@ -582,19 +694,20 @@ def export_to_nitrate(test):
     # List of bugs test verifies
     verifies_bug_ids = []
     for link in test.link:
-        try:
-            verifies_bug_ids.append(
-                int(re.search(RE_BUGZILLA_URL, link['verifies']).group(1)))
-        except Exception as err:
-            log.debug(err)
+        verifies = link.get('verifies')
+        # Skip other relations and links to fmf objects
+        if not isinstance(verifies, str):
+            continue
+        matched = _RE_BUGZILLA.search(verifies)
+        if matched:
+            verifies_bug_ids.append(int(matched.group(1)))
 
     # Add bugs to the Nitrate case
     if verifies_bug_ids:
         echo(style('Verifies bugs: ', fg='green') +
              ', '.join([f"BZ#{b}" for b in verifies_bug_ids]))
-    for bug_id in verifies_bug_ids:
-        if not dry_mode:
-            nitrate_case.bugs.add(nitrate.Bug(bug=int(bug_id)))
+        case_proxy.bugs.add(
+            [nitrate.Bug(bug=bug_id) for bug_id in verifies_bug_ids])
 
     # Update nitrate test case
     if not dry_mode:
@@ -728,12 +841,12 @@ def export_to_polarion(test):
     for link in test.link:
         try:
             bug_ids.append(
-                re.search(RE_BUGZILLA_URL, link['verifies']).group(1))
+                _RE_BUGZILLA.search(link['verifies']).group(1))
         except Exception as err:
             log.debug(err)
         try:
             requirements.append(
-                re.search(RE_POLARION_URL, link['verifies']).group(1))
+                _RE_POLARION.search(link['verifies']).group(1))
         except Exception as err:
             log.debug(err)
 
@@ -780,11 +893,17 @@ def add_to_nitrate_runs(nitrate_case, general_plan, test, dry_mode):
     Go down plan tree from general plan, add case and case run to
     all open runs. Try to apply adjust.
     """
+    # Runs often share the same environment, check each one just once
+    enabled = dict()
     for child_plan in nitrate.TestPlan.search(parent=general_plan.id):
         for testrun in child_plan.testruns:
             if testrun.status == nitrate.RunStatus("FINISHED"):
                 continue
-            if not enabled_for_environment(test, tcms_notes=testrun.notes):
+            notes = testrun.notes
+            if notes not in enabled:
+                enabled[notes] = enabled_for_environment(
+                    test, tcms_notes=notes)
+            if not enabled[notes]:
                 continue
             # nitrate_case is None when --dry and --create are used together
             if not nitrate_case or child_plan not in nitrate_case.testplans:
@@ -798,8 +917,13 @@ def add_to_nitrate_runs(nitrate_case, general_plan, test, dry_mode):
                     nitrate.CaseRun(testcase=nitrate_case, testrun=testrun)
 
 
-def enabled_for_environment(test, tcms_notes):
-    """ Check whether test is enabled for specified environment """
+@lru_cache(maxsize=256)
+def _environment_context(tcms_notes):
+    """
+    Prepare fmf context from the test run notes environment
+
+    Return None if there are no environment dimensions defined.
+    """
     field = tmt.utils.StructuredField(tcms_notes)
     context_dict = {}
     try:
@@ -807,24 +931,38 @@ def enabled_for_environment(test, tcms_notes):
             try:
                 dimension, values = line.split('=', maxsplit=2)
                 context_dict[dimension.strip()] = [
-                    value.strip() for value in re.split(",|and", values)]
+                    value.strip() for value in _RE_ENV_SPLIT.split(values)]
             except ValueError:
                 pass
     except tmt.utils.StructuredFieldError:
         pass
-
     if not context_dict:
+        return None
+    return fmf.context.Context(**context_dict)
+
+
+def enabled_for_environment(test, tcms_notes):
+    """ Check whether test is enabled for specified environment """
+    context = _environment_context(tcms_notes)
+    if context is None:
         return True
 
     try:
-        context = fmf.context.Context(**context_dict)
         test_node = test.node.copy()
         test_node.adjust(context)
-        return tmt.Test(test_node).enabled
     except BaseException as exception:
         log.debug(f"Failed to process adjust: {exception}")
         return True
 
+    # Only the 'enabled' key is needed, no need to create a whole test
+    enabled = test_node.get('enabled')
+    if enabled is None:
+        return True
+    if not isinstance(enabled, bool):
+        log.debug(f"Invalid 'enabled' value '{enabled}' after adjust.")
+        return True
+    return enabled
+
 
 def check_md_file_respects_spec(md_path):
     """
@@ -834,17 +972,14 @@ def check_md_file_respects_spec(md_path):
     """
     warnings_list = []
     sections_headings = tmt.base.SECTIONS_HEADINGS
-    required_headings = set(sections_headings['Step'] +
-                            sections_headings['Expect'])
-    values = []
-    for _ in list(sections_headings.values()):
-        values += _
+    step_headings = _section_headings('Step')
+    expect_headings = _section_headings('Expect')
+    required_headings = _section_headings('Step', 'Expect')
+    values = _section_headings(*sections_headings)
 
     md_to_html = tmt.utils.markdown_to_html(md_path)
-    html_headings_from_file = [i[0] for i in
-                               re.findall('(^<h[1-4]>(.+?)</h[1-4]>$)',
-                                          md_to_html,
-                                          re.M)]
+    html_headings_from_file = [
+        heading for _, heading, _ in _html_sections(md_to_html.splitlines())]
 
     # No invalid headings in the file w/o headings
     if not html_headings_from_file:
@@ -859,13 +994,17 @@ def check_md_file_respects_spec(md_path):
     # Remove invalid headings from html_headings_from_file
     for index in invalid_headings:
         warnings_list.append(f'unknown html heading "{index}" is used')
+    if invalid_headings:
+        invalid_headings = set(invalid_headings)
         html_headings_from_file = [i for i in html_headings_from_file
-                                   if i != index]
+                                   if i not in invalid_headings]
+
+    headings_count = collections.Counter(html_headings_from_file)
 
     def count_html_headings(heading):
-        if html_headings_from_file.count(heading) > 1:
+        if headings_count[heading] > 1:
             warnings_list.append(
-                f'{html_headings_from_file.count(heading)}'
+                f'{headings_count[heading]}'
                 f' headings "{heading}" are used')
 
     # Warn if 2 or more # Setup or # Cleanup are used
@@ -905,23 +1044,20 @@ def check_md_file_respects_spec(md_path):
         # Add # Test heading to close the file
         html_headings_from_file.append(sections_headings['Test'][0])
 
+    # Positions of all test section headings
+    test_positions = [
+        index for index, heading in enumerate(html_headings_from_file)
+        if _RE_TEST_H1.search(heading)]
+
     index = 0
     while html_headings_from_file:
         # # Step cannot be used outside of test sections.
-        if html_headings_from_file[index] == \
-                sections_headings['Step'][0] or \
-                html_headings_from_file[index] == \
-                sections_headings['Step'][1]:
+        if html_headings_from_file[index] in step_headings:
             warnings_list.append(warn_outside_test_section.format(
                 html_headings_from_file[index], 'Step'))
 
         # # Expect cannot be used outside of test sections.
-        if html_headings_from_file[index] == \
-                sections_headings['Expect'][0] or \
-                html_headings_from_file[index] == \
-                sections_headings['Expect'][1] or \
-                html_headings_from_file[index] == \
-                sections_headings['Expect'][2]:
+        if html_headings_from_file[index] in expect_headings:
             warnings_list.append(warn_outside_test_section.format(
                 html_headings_from_file[index], 'Expect'))
 
@@ -931,37 +1067,37 @@ def check_md_file_respects_spec(md_path):
                 html_headings_from_file[index + 1]
             except IndexError:
                 break
-            for i, v in enumerate(html_headings_from_file[index + 1:]):
-                if re.search('^<h1>(Test .*|Test)</h1>$', v):
-                    test_section = html_headings_from_file[index + 1:
-                                                           index + 1 + i]
-
-                    # Unexpected headings inside Test section
-                    unexpected_headings = set(test_section) - \
-                        required_headings
-                    if unexpected_headings:
-                        warnings_list.append(
-                            warn_unexpected_headings.
-                            format(', '.join(unexpected_headings),
-                                   test_section_name))
-
-                    amount_of_steps = required_section_exists(
-                        test_section,
-                        'Step',
-                        tuple(sections_headings['Step']))
-                    amount_of_expects = required_section_exists(
-                        test_section,
-                        'Expect',
-                        tuple(sections_headings['Expect']))
-
-                    # # Step isn't in pair with # Expect
-                    if amount_of_steps != amount_of_expects != 0:
-                        warnings_list.append(warn_headings_not_in_pairs.
-                                             format(amount_of_steps,
-                                                    amount_of_expects,
-                                                    test_section_name))
-                    index += i
-                    break
+            # Find where the next test section starts
+            position = bisect.bisect_right(test_positions, index)
+            if position < len(test_positions):
+                next_index = test_positions[position]
+                test_section = html_headings_from_file[index + 1:next_index]
+
+                # Unexpected headings inside Test section
+                unexpected_headings = set(test_section) - \
+                    required_headings
+                if unexpected_headings:
+                    warnings_list.append(
+                        warn_unexpected_headings.
+                        format(', '.join(unexpected_headings),
+                               test_section_name))
+
+                amount_of_steps = required_section_exists(
+                    test_section,
+                    'Step',
+                    tuple(sections_headings['Step']))
+                amount_of_expects = required_section_exists(
+                    test_section,
+                    'Expect',
+                    tuple(sections_headings['Expect']))
+
+                # # Step isn't in pair with # Expect
+                if amount_of_steps != amount_of_expects != 0:
+                    warnings_list.append(warn_headings_not_in_pairs.
+                                         format(amount_of_steps,
+                                                amount_of_expects,
+                                                test_section_name))
+                index = next_index - 1
 
         index += 1
         if index >= len(html_headings_from_file) - 1:
@@ -971,9 +1107,11 @@ def check_md_file_respects_spec(md_path):
 
 def return_markdown_file():
     """ Return path to the markdown file """
-    files = '\n'.join(os.listdir())
-    reg_exp = r'.+\.md$'
-    md_files = re.findall(reg_exp, files, re.M)
+    with os.scandir() as entries:
+        md_files = [
+            entry.name for entry in entries
+            if entry.name.endswith('.md') and len(entry.name) > 3
+            and entry.is_file()]
     fail_message = "in the current working directory.\n" \
                    "Manual steps couldn't be exported"
     if len(md_files) == 1:
@@ -1022,19 +1160,102 @@ def create_polarion_case(summary, project_id=None):
 
 def prepare_extra_summary(test):
     """ extra-summary for export --create test """
-    remote_dirname = re.sub('.git$', '', os.path.basename(test.fmf_id['url']))
+    # No need to generate anything if provided in the metadata
+    extra_summary = test.node.get('extra-summary')
+    if extra_summary is not None:
+        return extra_summary
+    remote_dirname = os.path.basename(test.fmf_id['url'])
+    # Strip the git suffix (str.removesuffix() is not available in 3.8)
+    if remote_dirname.endswith('.git'):
+        remote_dirname = remote_dirname[:-4]
     if not remote_dirname:
         raise ConvertError("Unable to find git remote url.")
     generated = f"{remote_dirname} {test.name}"
     if test.summary:
         generated += f" - {test.summary}"
-    return test.node.get('extra-summary', generated)
+    return generated
+
+
+def _general_plans_cache_key(component):
+    """ Cache key of the component general plan on the current server """
+    return f"{nitrate.Config().nitrate.url} {component}"
+
+
+def _general_plans_cache_path():
+    """ Path to the persistent general plans cache """
+    # Relative paths should be ignored according to the XDG spec
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home or not os.path.isabs(cache_home):
+        cache_home = os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, GENERAL_PLANS_CACHE)
+
+
+def _valid_general_plans(cached):
+    """ Generate well-formed cached general plans which have not expired """
+    if not isinstance(cached, dict):
+        return
+    now = time.time()
+    for key, entry in cached.items():
+        if not isinstance(entry, dict):
+            continue
+        plan_id, stored = entry.get('id'), entry.get('time')
+        if not isinstance(plan_id, int) or isinstance(plan_id, bool):
+            continue
+        if not isinstance(stored, (int, float)) or isinstance(stored, bool):
+            continue
+        if now - GENERAL_PLANS_CACHE_TTL < stored <= now:
+            yield key, entry
+
+
+@lru_cache(maxsize=None)
+def _general_plans_cache():
+    """ Load valid general plan ids stored by previous runs """
+    try:
+        with open(_general_plans_cache_path()) as cache:
+            fcntl.flock(cache, fcntl.LOCK_SH)
+            cached = json.load(cache)
+    except (OSError, ValueError):
+        return dict()
+    return dict(
+        (key, entry['id']) for key, entry in _valid_general_plans(cached))
+
+
+def _store_general_plan(key, plan_id):
+    """ Store general plan id to the persistent cache, drop expired """
+    path = _general_plans_cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a+') as cache:
+            fcntl.flock(cache, fcntl.LOCK_EX)
+            cache.seek(0)
+            try:
+                cached = json.load(cache)
+            except ValueError:
+                cached = dict()
+            cached = dict(_valid_general_plans(cached))
+            cached[key] = dict(id=plan_id, time=time.time())
+            cache.seek(0)
+            cache.truncate()
+            json.dump(cached, cache)
+    except OSError as error:
+        log.debug(f"Unable to store general plan cache '{path}': {error}")
 
 
 # avoid multiple searching for general plans (it is expensive)
 @lru_cache(maxsize=None)
-def find_general_plan(component):
-    """ Return single General Test Plan or raise an error """
+def find_general_plan(component, dry=False):
+    """
+    Return single General Test Plan or raise an error
+
+    Plans found are stored in a persistent cache for subsequent runs,
+    use 'dry' to leave the cache untouched.
+    """
+    # Use the plan found by a previous run if still valid
+    key = _general_plans_cache_key(component)
+    try:
+        return nitrate.TestPlan(_general_plans_cache()[key])
+    except KeyError:
+        pass
     # At first find by linked components
     found = nitrate.TestPlan.search(
         type__name="General",
@@ -1055,4 +1276,6 @@ def find_general_plan(component):
         nitrate.NitrateError(
             "Multiple general test plans found for '{component}' component.")
     # Finally return the one and only General plan
+    if not dry:
+        _store_general_plan(key, found[0].id)
     return found[0]
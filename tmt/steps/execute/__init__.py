@@ -1,12 +1,18 @@
+import json
 import os
 import re
+import sys
 import time
 from dataclasses import dataclass, field
 from typing import List
 
+if sys.version_info >= (3, 9):
+    from importlib.resources import files
+else:
+    import pkg_resources
+
 import click
 import fmf
-import pkg_resources
 
 import tmt
 
@@ -20,12 +26,21 @@ DEFAULT_FRAMEWORK = 'shell'
 TEST_OUTPUT_FILENAME = 'output.txt'
 
 # Scripts source directory
-SCRIPTS_SRC_DIR = pkg_resources.resource_filename(
-    'tmt', 'steps/execute/scripts')
+if sys.version_info >= (3, 9):
+    SCRIPTS_SRC_DIR = str(files('tmt').joinpath('steps/execute/scripts'))
+else:
+    SCRIPTS_SRC_DIR = pkg_resources.resource_filename(
+        'tmt', 'steps/execute/scripts')
 
 # File in which report-result output is stored.
 RESTRAINT_REPORT_RESULT_OUTPUT = "restraint-result"
 
+# Deprecated execute methods
+_OLD_METHODS = frozenset(['shell', 'beakerlib', 'shell.tmt', 'beakerlib.tmt'])
+
+# Precompiled regular expressions
+_RE_OLD_METHOD = re.compile(r"^(shell|beakerlib)(\.tmt)?$")
+
 
 class Execute(tmt.steps.Step):
     """
@@ -48,6 +63,11 @@ class Execute(tmt.steps.Step):
         super().__init__(plan=plan, data=data)
         # List of Result() objects representing test results
         self._results = []
+        # Exported results kept up-to-date with the list above
+        self._results_export = {}
+        # Exported results already stored in the results file (None
+        # means the file has not been written yet)
+        self._saved_results = None
 
         # List of scripts to install
         self.scripts = []
@@ -64,9 +84,13 @@ class Execute(tmt.steps.Step):
         extra_keys = extra_keys or []
         super().load(extra_keys)
         try:
-            results = tmt.utils.yaml_to_dict(self.read('results.yaml'))
+            # Use the safe loader, it is backed by libyaml when available
+            results = tmt.utils.yaml_to_dict(
+                self.read('results.yaml'), yaml_type='safe')
             self._results = [
                 tmt.Result(data, test) for test, data in results.items()]
+            self._results_export = dict([
+                (result.name, result.export()) for result in self._results])
         except tmt.utils.FileError:
             self.debug('Test results not found.', level=2)
 
@@ -74,16 +98,19 @@ class Execute(tmt.steps.Step):
         """ Save test results to the workdir """
         data = data or {}
         super().save(data)
-        results = dict([
-            (result.name, result.export()) for result in self.results()])
-        self.write('results.yaml', tmt.utils.dict_to_yaml(results))
+        # Rewrite the results file only if it's not up-to-date already
+        if self._results_export != self._saved_results:
+            self.write(
+                'results.yaml', tmt.utils.dict_to_yaml(self._results_export))
+            self._saved_results = dict(self._results_export)
 
     def _map_old_methods(self):
         """ Map the old execute methods in a backward-compatible way """
         how = self.data[0]['how']
-        matched = re.search(r"^(shell|beakerlib)(\.tmt)?$", how)
-        if not matched:
+        # Most plans use the current methods, no need to check further
+        if how not in _OLD_METHODS:
             return
+        matched = _RE_OLD_METHOD.search(how)
         # Show the old method deprecation warning to users
         self.warn(f"The '{how}' execute method has been deprecated.")
         # Map the old syntax to the appropriate executor
@@ -153,7 +180,10 @@ class Execute(tmt.steps.Step):
                 if phase.enabled_on_guest(guest):
                     phase.go(guest)
                     if isinstance(phase, ExecutePlugin):
-                        self._results.extend(phase.results())
+                        for result in phase.results():
+                            self._results.append(result)
+                            self._results_export[result.name] = (
+                                result.export())
 
         # Give a summary, update status and save
         self.summary()
@@ -194,6 +224,12 @@ class ExecutePlugin(tmt.steps.Plugin):
     # Internal executor is the default implementation
     how = 'tmt'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Test data directories and paths already constructed
+        self._data_directories = dict()
+        self._data_paths = dict()
+
     @classmethod
     def base_command(cls, method_class=None, usage=None):
         """ Create base click command (common for all execute plugins) """
@@ -243,14 +279,26 @@ class ExecutePlugin(tmt.steps.Plugin):
         filename not provided) or to the given data file otherwise.
         """
         # Prepare directory path, create if requested
-        directory = os.path.join(
-            self.step.workdir, TEST_DATA, test.name.lstrip('/'))
-        if create and not os.path.isdir(directory):
-            os.makedirs(os.path.join(directory, TEST_DATA))
+        try:
+            directory = self._data_directories[test.name]
+        except KeyError:
+            directory = self._data_directories[test.name] = os.path.join(
+                self.step.workdir, TEST_DATA, test.name.lstrip('/'))
+        if create:
+            os.makedirs(os.path.join(directory, TEST_DATA), exist_ok=True)
         if not filename:
             return directory
+        # Paths are constant for the workdir, construct them only once
+        key = (test.name, filename, full)
+        try:
+            return self._data_paths[key]
+        except KeyError:
+            pass
         path = os.path.join(directory, filename)
-        return path if full else os.path.relpath(path, self.step.workdir)
+        if not full:
+            path = os.path.relpath(path, self.step.workdir)
+        self._data_paths[key] = path
+        return path
 
     def prepare_tests(self):
         """
@@ -259,29 +307,34 @@ class ExecutePlugin(tmt.steps.Plugin):
         Check which tests have been discovered, for each test prepare
         the aggregated metadata in a 'metadata.yaml' file under the test
         data directory and finally return a list of discovered tests.
+        The metadata are stored in the json format which is much faster
+        to produce and can still be loaded by any yaml parser. Metadata
+        with values which json cannot represent are stored as yaml.
         """
         tests = self.discover.tests()
         for test in tests:
             metadata_filename = self.data_path(
                 test, filename='metadata.yaml', full=True, create=True)
-            self.write(
-                metadata_filename, tmt.utils.dict_to_yaml(test._metadata))
+            try:
+                metadata = json.dumps(
+                    test._metadata, separators=(',', ':'), ensure_ascii=False)
+            except TypeError:
+                metadata = tmt.utils.dict_to_yaml(test._metadata)
+            self.write(metadata_filename, metadata)
         return tests
 
     def prepare_scripts(self, guest):
         """
         Prepare additional scripts for testing
         """
-        # Install all scripts on guest
+        # Install all scripts on guest at once
+        files = []
         for script in self.scripts:
             source = os.path.join(
                 SCRIPTS_SRC_DIR, os.path.basename(script.path))
-
             for dest in [script.path] + script.aliases:
-                guest.push(
-                    source=source,
-                    destination=dest,
-                    options=["-p", "--chmod=755"])
+                files.append((source, dest))
+        guest.push_many(files, options=["-p", "--chmod=755"])
 
     def check_shell(self, test):
         """ Check result of a shell test """
@@ -289,9 +342,11 @@ class ExecutePlugin(tmt.steps.Plugin):
         data = {'log': self.data_path(test, TEST_OUTPUT_FILENAME),
                 'duration': test.real_duration}
         # Process the exit code
-        try:
-            data['result'] = {0: 'pass', 1: 'fail'}[test.returncode]
-        except KeyError:
+        if test.returncode == 0:
+            data['result'] = 'pass'
+        elif test.returncode == 1:
+            data['result'] = 'fail'
+        else:
             data['result'] = 'error'
             # Add note about the exceeded duration
             if test.returncode == tmt.utils.PROCESS_TIMEOUT:
@@ -305,25 +360,41 @@ class ExecutePlugin(tmt.steps.Plugin):
         data = {'result': 'error',
                 'log': [],
                 'duration': test.real_duration}
+        # List the test data directory once instead of checking each file
+        try:
+            with os.scandir(self.data_path(test, full=True)) as entries:
+                present = set(
+                    entry.name for entry in entries if entry.is_file())
+        except OSError:
+            present = set()
         for log in [TEST_OUTPUT_FILENAME, 'journal.txt']:
-            if os.path.isfile(self.data_path(test, log, full=True)):
+            if log in present:
                 data['log'].append(self.data_path(test, log))
-        # Check beakerlib log for the result
+        # Check beakerlib log for the result, only two lines are needed
+        beakerlib_results_file = self.data_path(
+            test, 'TestResults', full=True)
+        self.debug(f"Read file '{beakerlib_results_file}'.", level=3)
+        result = state = None
         try:
-            beakerlib_results_file = self.data_path(
-                test, 'TestResults', full=True)
-            results = self.read(beakerlib_results_file, level=3)
-        except tmt.utils.FileError:
+            with open(beakerlib_results_file,
+                      encoding='utf-8', errors='replace') as results:
+                for line in results:
+                    if result is None and line.startswith(
+                            'TESTRESULT_RESULT_STRING='):
+                        result = line.split('=', 1)[1].rstrip('\n')
+                    # States are: started, incomplete and complete
+                    # FIXME In quotes until beakerlib/beakerlib/pull/92
+                    # is merged
+                    elif state is None and line.startswith(
+                            'TESTRESULT_STATE='):
+                        state = line.split('=', 1)[1].strip().strip('"')
+                    if result is not None and state is not None:
+                        break
+        except OSError:
             self.debug(f"Unable to read '{beakerlib_results_file}'.", level=3)
             data['note'] = 'beakerlib: TestResults FileError'
             return tmt.Result(data, name=test.name, interpret=test.result)
-        try:
-            result = re.search(
-                'TESTRESULT_RESULT_STRING=(.*)', results).group(1)
-            # States are: started, incomplete and complete
-            # FIXME In quotes until beakerlib/beakerlib/pull/92 is merged
-            state = re.search(r'TESTRESULT_STATE="?(\w+)"?', results).group(1)
-        except AttributeError:
+        if not result or not state:
             self.debug(
                 f"No result or state found in '{beakerlib_results_file}'.",
                 level=3)
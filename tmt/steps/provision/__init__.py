@@ -4,6 +4,7 @@ import os
 import random
 import re
 import shlex
+import shutil
 import string
 import subprocess
 import tempfile
@@ -441,6 +442,17 @@ class Guest(tmt.utils.Common):
 
         raise NotImplementedError()
 
+    def push_many(self, files, options=None):
+        """
+        Push multiple files to the guest
+
+        The 'files' argument is a list of (source, destination) pairs.
+        By default the files are pushed one by one, guests which are
+        able to transfer them at once should override this method.
+        """
+        for source, destination in files:
+            self.push(source=source, destination=destination, options=options)
+
     def pull(
             self,
             source=None,
@@ -705,7 +717,8 @@ class GuestSsh(Guest):
         By default the whole plan workdir is synced to the same location
         on the guest. Use the 'source' and 'destination' to sync custom
         location and the 'options' parametr to modify default options
-        which are '-Rrz --links --safe-links --delete'.
+        which are '-Rrz --links --safe-links --delete'. The 'source' can
+        be a list of paths as well to transfer multiple files at once.
         """
         # Prepare options and the push command
         if options is None:
@@ -715,15 +728,22 @@ class GuestSsh(Guest):
         if source is None:
             source = self.parent.plan.workdir
             self.debug(f"Push workdir to guest '{self.guest}'.")
+        elif isinstance(source, list):
+            self.debug(
+                f"Copy {fmf.utils.listed(source, 'file')} "
+                f"to '{destination}' on the guest.")
         else:
             self.debug(f"Copy '{source}' to '{destination}' on the guest.")
 
+        # Multiple sources can be transferred at once
+        sources = source if isinstance(source, list) else [source]
+
         def rsync():
             """ Run the rsync command """
             self.run(
                 ["rsync"] + options
                 + ["-e", self._ssh_command(join=True)]
-                + [source, f"{self._ssh_guest()}:{destination}"])
+                + sources + [f"{self._ssh_guest()}:{destination}"])
 
         # Try to push twice, check for rsync after the first failure
         try:
@@ -740,6 +760,34 @@ class GuestSsh(Guest):
                     f"that login as '{self.user}' to the guest does not work.")
                 raise
 
+    def push_many(self, files, options=None):
+        """
+        Push multiple files to the guest using a single rsync
+
+        Files are staged in a local temporary directory under their
+        destination paths and transferred together as relative paths.
+        Destination directories have to exist on the guest already.
+        """
+        if not files:
+            return
+        if options is None:
+            options = DEFAULT_RSYNC_OPTIONS
+        with tempfile.TemporaryDirectory() as staging:
+            sources = []
+            for source, destination in files:
+                self.debug(
+                    f"Copy '{source}' to '{destination}' on the guest.")
+                relative = destination.lstrip('/')
+                staged = os.path.join(staging, relative)
+                os.makedirs(os.path.dirname(staged), exist_ok=True)
+                shutil.copy(source, staged)
+                # The dot marks where the relative path name starts
+                sources.append(os.path.join(staging, '.', relative))
+            self.push(
+                source=sources,
+                destination='/',
+                options=options + ['--relative', '--no-implied-dirs'])
+
     def pull(
             self,
             source=None,
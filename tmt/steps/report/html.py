@@ -1,15 +1,24 @@
 import os
 import os.path
+import sys
 import webbrowser
 
+if sys.version_info >= (3, 9):
+    from importlib.resources import files
+else:
+    import pkg_resources
+
 import click
-import pkg_resources
 
 import tmt
 import tmt.steps.report
 
-HTML_TEMPLATE_PATH = pkg_resources.resource_filename(
-    'tmt', 'steps/report/html/template.html.j2')
+if sys.version_info >= (3, 9):
+    HTML_TEMPLATE_PATH = str(
+        files('tmt').joinpath('steps/report/html/template.html.j2'))
+else:
+    HTML_TEMPLATE_PATH = pkg_resources.resource_filename(
+        'tmt', 'steps/report/html/template.html.j2')
 
 
 def import_jinja2():